@@ -15,14 +15,31 @@ Environment Variables:
     IMAGE_NAME: Image name (default: github-actions-runner-kubectl)
     IMAGE_TAG: Image tag (default: latest)
     DOCKERFILE_PATH: Path to Dockerfile (default: ./Dockerfile)
+    CACHE_BACKEND: BuildKit cache backend: registry, gha or local (default: registry)
 """
 
 import os
+import re
 import sys
+import time
+import json
+import mmap
+import hashlib
+import stat
+import shlex
+import shutil
+import base64
 import argparse
 import logging
 import subprocess
-from typing import Optional, List
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from functools import lru_cache
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, List, Tuple
 from pathlib import Path
 
 # Configure logging
@@ -32,6 +49,90 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Defaults for command line arguments, read from the environment once at import
+_DEFAULTS = {
+    key: os.environ.get(key, default)
+    for key, default in [
+        ("REGISTRY_URL", "ghcr.io"),
+        ("REGISTRY_USERNAME", None),
+        ("REGISTRY_PASSWORD", None),
+        ("IMAGE_NAME", "github-actions-runner-kubectl"),
+        ("IMAGE_TAG", "latest"),
+        ("DOCKERFILE_PATH", "./Dockerfile"),
+        ("CACHE_BACKEND", "registry"),
+    ]
+}
+
+# Name of the buildx builder used for cache-enabled builds
+BUILDER_NAME = "gha-runner-builder"
+
+# Supported BuildKit cache backends
+CACHE_BACKENDS = ("registry", "gha", "local")
+
+# Variables the "gha" cache backend needs; GitHub only exposes them to actions, not run steps
+GHA_CACHE_ENV = ("ACTIONS_RUNTIME_TOKEN", "ACTIONS_CACHE_URL")
+
+# Directory used by the "local" cache backend
+LOCAL_CACHE_DIR = ".buildx-cache"
+
+# Platform built when none is requested
+DEFAULT_PLATFORMS = ["linux/amd64"]
+
+# Image label recording the digest of the build context it was built from
+CONTEXT_DIGEST_LABEL = "ctx-sha"
+
+# Files larger than this many bytes are memory-mapped while hashing the build context
+MMAP_THRESHOLD = 1024 * 1024
+
+# Number of trailing output lines kept from each command for error reporting
+OUTPUT_TAIL_LINES = 20
+
+# Upper bound on concurrent "docker push" processes
+MAX_PUSH_WORKERS = 8
+
+# Number of "docker login" attempts and the delay in seconds between them
+LOGIN_ATTEMPTS = 2
+LOGIN_RETRY_DELAY = 1
+
+# Registry names referring to Docker Hub, and the key Docker stores its credentials under
+DOCKER_HUB_HOSTS = ("docker.io", "index.docker.io")
+DOCKER_HUB_AUTH_KEY = "https://index.docker.io/v1/"
+
+# Timeout in seconds for Registry v2 API requests
+REGISTRY_TIMEOUT = 10
+
+# Manifest media types accepted when querying the registry
+MANIFEST_MEDIA_TYPES = ", ".join([
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+])
+
+
+# Subprocesses are started with close_fds=False and an absolute executable path,
+# which lets CPython use posix_spawn instead of fork+exec and skips closing every
+# descriptor in the child. This is safe: descriptors Python opens are
+# non-inheritable (PEP 446), so children still only receive their stdio pipes.
+@lru_cache(maxsize=None)
+def _which(program: str) -> str:
+    """Resolve a program to an absolute path, falling back to the bare name."""
+    return shutil.which(program) or program
+
+
+class _RegistryRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Drop the registry token when a blob request is redirected to another host."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        new_request = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if new_request is not None:
+            if urllib.parse.urlsplit(newurl).netloc != urllib.parse.urlsplit(req.full_url).netloc:
+                new_request.remove_header("Authorization")
+        return new_request
+
+
+_registry_opener = urllib.request.build_opener(_RegistryRedirectHandler)
+
 
 class DockerBuilder:
     """Handles Docker image building and pushing operations."""
@@ -42,140 +143,418 @@ class DockerBuilder:
         username: Optional[str] = None,
         password: Optional[str] = None,
         image_name: str = "github-actions-runner-kubectl",
-        dockerfile_path: str = "./Dockerfile"
+        dockerfile_path: str = "./Dockerfile",
+        context_path: str = ".",
+        cache_backend: str = "registry",
+        platforms: Optional[List[str]] = None,
+        validate: bool = False
     ):
         self.registry_url = registry_url.rstrip('/')
         self.username = username
         self.password = password
         self.image_name = image_name
         self.dockerfile_path = Path(dockerfile_path)
+        self.context_path = Path(context_path)
+
+        # GitHub Container Registry requires a lowercase namespace
+        namespace = self.username
+        if namespace and self.registry_url == "ghcr.io":
+            namespace = namespace.lower()
+        if namespace:
+            self._prefix = f"{self.registry_url}/{namespace}/{self.image_name}"
+        else:
+            self._prefix = f"{self.registry_url}/{self.image_name}"
+
+        if cache_backend not in CACHE_BACKENDS:
+            raise ValueError(f"Unsupported cache backend: {cache_backend}")
+        self.cache_backend = cache_backend
+        self.platforms = list(platforms or DEFAULT_PLATFORMS)
+
+        # Keep a separate cache per platform set, e.g. buildcache-amd64-arm64
+        arches = "-".join(p.split("/", 1)[-1].replace("/", "-") for p in self.platforms)
+        self.cache_ref = self.get_full_image_name(f"buildcache-{arches}")
+        self._builder_ready = False
+        self._token: Optional[str] = None
         
-        # Validate Dockerfile exists
-        if not self.dockerfile_path.exists():
-            raise FileNotFoundError(f"Dockerfile not found at {self.dockerfile_path}")
+        # Dockerfile is checked when building, unless eager validation is requested
+        if validate:
+            self.validate_dockerfile()
     
-    def run_command(self, command: List[str], check: bool = True) -> subprocess.CompletedProcess:
-        """Run a shell command and return the result."""
-        logger.info(f"Running: {' '.join(command)}")
-        try:
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                check=check
-            )
-            if result.stdout:
-                logger.info(f"Output: {result.stdout.strip()}")
-            return result
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Command failed: {e}")
-            if e.stderr:
-                logger.error(f"Error output: {e.stderr.strip()}")
-            raise
+    def validate_dockerfile(self) -> None:
+        """Raise FileNotFoundError unless the Dockerfile is an existing file."""
+        if not self.dockerfile_path.is_file():
+            raise FileNotFoundError(f"Dockerfile not found at {self.dockerfile_path}")
+
+    def run_command(
+        self,
+        command: List[str],
+        check: bool = True,
+        log_prefix: Optional[str] = None
+    ) -> subprocess.CompletedProcess:
+        """Run a shell command, logging its output as it is produced.
+
+        Output is streamed rather than captured: the returned result only
+        carries the last OUTPUT_TAIL_LINES lines of combined output in
+        ``stdout``. Each logged line is prefixed with ``log_prefix`` when
+        given, so concurrent commands can be told apart.
+        """
+        prefix = f"[{log_prefix}] " if log_prefix else ""
+        logger.info("%sRunning: %s", prefix, shlex.join(command))
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            executable=_which(command[0]),
+            close_fds=False
+        )
+        tail = deque(maxlen=OUTPUT_TAIL_LINES)
+        with process:
+            for line in process.stdout:
+                line = line.rstrip()
+                tail.append(line)
+                logger.info("%s%s", prefix, line)
+
+        output = "\n".join(tail)
+        if check and process.returncode:
+            logger.error("%sCommand failed with return code %d: %s", prefix, process.returncode, shlex.join(command))
+            raise subprocess.CalledProcessError(process.returncode, command, output=output)
+        return subprocess.CompletedProcess(command, process.returncode, output, "")
     
     def login(self) -> bool:
-        """Login to the container registry."""
+        """Login to the container registry, retrying once on failure."""
         if not self.username or not self.password:
             logger.warning("No credentials provided, skipping login")
             return False
 
-        try:
-            logger.info(f"Logging in to {self.registry_url}")
-
-            # Method 1: Try with --password-stdin (preferred method)
+        logger.info(f"Logging in to {self.registry_url}")
+        for attempt in range(1, LOGIN_ATTEMPTS + 1):
             try:
                 login_process = subprocess.Popen(
                     ["docker", "login", self.registry_url, "--username", self.username, "--password-stdin"],
                     stdin=subprocess.PIPE,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
-                    text=True
+                    text=True,
+                    executable=_which("docker"),
+                    close_fds=False
                 )
 
-                # Send password to stdin with timeout
                 try:
                     stdout, stderr = login_process.communicate(input=self.password + '\n', timeout=30)
                 except subprocess.TimeoutExpired:
                     login_process.kill()
-                    logger.error("Docker login timed out after 30 seconds")
-                    return self._fallback_login()
-
-                if login_process.returncode == 0:
-                    logger.info("Successfully logged in to registry")
-                    if stdout.strip():
-                        logger.info(f"Login output: {stdout.strip()}")
-                    return True
+                    login_process.communicate()
+                    logger.warning(f"Docker login timed out after 30 seconds (attempt {attempt}/{LOGIN_ATTEMPTS})")
                 else:
-                    logger.warning(f"Standard login failed with return code {login_process.returncode}")
+                    if login_process.returncode == 0:
+                        logger.info("Successfully logged in to registry")
+                        if stdout.strip():
+                            logger.info(f"Login output: {stdout.strip()}")
+                        return True
+
+                    logger.warning(
+                        f"Login failed with return code {login_process.returncode} "
+                        f"(attempt {attempt}/{LOGIN_ATTEMPTS})"
+                    )
                     if stderr.strip():
                         logger.warning(f"Login error: {stderr.strip()}")
-                    return self._fallback_login()
 
             except Exception as e:
-                logger.warning(f"Standard login method failed: {e}")
-                return self._fallback_login()
+                logger.warning(f"Login error (attempt {attempt}/{LOGIN_ATTEMPTS}): {e}")
 
-        except Exception as e:
-            logger.error(f"Login error: {e}")
+            if attempt < LOGIN_ATTEMPTS:
+                time.sleep(LOGIN_RETRY_DELAY)
+
+        logger.error(f"Could not log in to {self.registry_url}")
+        return False
+
+    def _docker_config_path(self) -> Path:
+        """Get the path of the Docker CLI configuration file."""
+        return Path(os.environ.get("DOCKER_CONFIG", Path.home() / ".docker")) / "config.json"
+
+    def _write_docker_auth(self) -> bool:
+        """Store registry credentials in the Docker config without running docker login.
+
+        Falls back to ``login`` when a credential helper manages the registry,
+        since Docker would ignore a plain ``auths`` entry in that case.
+        """
+        if not self.username or not self.password:
+            logger.warning("No credentials provided, skipping login")
             return False
 
-    def _fallback_login(self) -> bool:
-        """Fallback login method using environment variable."""
+        config_path = self._docker_config_path()
         try:
-            logger.info("Trying fallback login method...")
+            config = {}
+            if config_path.exists():
+                with config_path.open() as f:
+                    config = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read {config_path}: {e}")
+            return self.login()
 
-            # Set password as environment variable temporarily
-            env = os.environ.copy()
-            env['DOCKER_PASSWORD'] = self.password
+        server = DOCKER_HUB_AUTH_KEY if self.registry_url in DOCKER_HUB_HOSTS else self.registry_url
+        if config.get("credsStore") or server in config.get("credHelpers", {}):
+            logger.info("Docker credential helper configured, using docker login")
+            return self.login()
 
-            # Use echo to pipe password
-            echo_process = subprocess.Popen(
-                ["echo", self.password],
-                stdout=subprocess.PIPE,
-                text=True
-            )
+        auth = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+        config.setdefault("auths", {})[server] = {"auth": auth}
 
-            login_process = subprocess.Popen(
-                ["docker", "login", self.registry_url, "--username", self.username, "--password-stdin"],
-                stdin=echo_process.stdout,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+        try:
+            config_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = config_path.with_name(config_path.name + ".tmp")
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(config, f, indent=2)
+            os.replace(tmp_path, config_path)
+        except OSError as e:
+            logger.warning(f"Could not write {config_path}: {e}")
+            return self.login()
+
+        logger.info(f"Stored credentials for {server} in {config_path}")
+        return True
+
+    @property
+    def is_multi_platform(self) -> bool:
+        """Whether the image is built for more than one platform."""
+        return len(self.platforms) > 1
+
+    def ensure_builder(self) -> None:
+        """Create the buildx builder if it does not exist yet."""
+        if self._builder_ready:
+            return
+
+        result = self.run_command(["docker", "buildx", "inspect", BUILDER_NAME], check=False)
+        if result.returncode != 0:
+            logger.info(f"Creating buildx builder: {BUILDER_NAME}")
+            self.run_command(["docker", "buildx", "create", "--name", BUILDER_NAME, "--driver", "docker-container"])
+        self._builder_ready = True
 
-            echo_process.stdout.close()
-            stdout, stderr = login_process.communicate(timeout=30)
+    def cache_args(self, export: bool = True) -> List[str]:
+        """Get the --cache-from/--cache-to arguments for the configured backend."""
+        if self.cache_backend == "gha":
+            missing = [name for name in GHA_CACHE_ENV if not os.environ.get(name)]
+            if missing:
+                logger.warning(
+                    f"{', '.join(missing)} not set, the gha cache backend will not work. "
+                    "Expose them to this step, e.g. with crazy-max/ghaction-github-runtime"
+                )
+            cache_from = "type=gha"
+            cache_to = "type=gha,mode=max"
+        elif self.cache_backend == "local":
+            cache_from = f"type=local,src={LOCAL_CACHE_DIR}"
+            cache_to = f"type=local,dest={LOCAL_CACHE_DIR},mode=max"
+        else:
+            cache_from = f"type=registry,ref={self.cache_ref}"
+            cache_to = f"type=registry,ref={self.cache_ref},mode=max"
+
+        args = ["--cache-from", cache_from]
+        if export:
+            args.extend(["--cache-to", cache_to])
+        return args
 
-            if login_process.returncode == 0:
-                logger.info("Successfully logged in using fallback method")
-                return True
+    @staticmethod
+    def _dockerignore_regex(pattern: str) -> "re.Pattern":
+        """Translate a .dockerignore pattern into a regex matching a path or its descendants."""
+        regex = ""
+        i = 0
+        while i < len(pattern):
+            c = pattern[i]
+            if pattern.startswith("**", i):
+                i += 1
+                if pattern.startswith("/", i + 1):
+                    # "**/" matches zero or more directories
+                    i += 1
+                    regex += "(?:.*/)?"
+                else:
+                    regex += ".*"
+            elif c == "*":
+                regex += "[^/]*"
+            elif c == "?":
+                regex += "[^/]"
+            elif c == "[" and "]" in pattern[i + 1:]:
+                end = pattern.index("]", i + 1)
+                char_class = pattern[i + 1:end]
+                if char_class.startswith("!"):
+                    char_class = "^" + char_class[1:]
+                regex += f"[{char_class}]"
+                i = end
             else:
-                logger.error(f"Fallback login also failed: {stderr}")
-                return False
+                regex += re.escape(c)
+            i += 1
+        return re.compile(f"^{regex}(?:/.*)?$")
 
-        except Exception as e:
-            logger.error(f"Fallback login error: {e}")
-            return False
-    
-    def build_image(self, tags: List[str], build_args: Optional[dict] = None) -> bool:
-        """Build the Docker image with specified tags."""
+    def _dockerignore_rules(self) -> List[Tuple["re.Pattern", bool]]:
+        """Parse .dockerignore into (regex, is_exception) rules, in file order."""
+        dockerignore = self.context_path / ".dockerignore"
+        if not dockerignore.is_file():
+            return []
+
+        rules = []
+        for line in dockerignore.read_text().splitlines():
+            pattern = line.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            exception = pattern.startswith("!")
+            if exception:
+                pattern = pattern[1:].strip()
+            pattern = os.path.normpath(pattern.lstrip("/")).replace(os.sep, "/")
+            rules.append((self._dockerignore_regex(pattern), exception))
+        return rules
+
+    def _context_digest(self, build_args: Optional[dict] = None) -> Optional[str]:
+        """Compute a SHA-256 digest of the build inputs.
+
+        Covers every regular file and symlink of the build context not
+        excluded by .dockerignore, the Dockerfile, the build arguments and
+        the target platforms. Returns None if the context cannot be read.
+        """
         try:
+            return self._hash_context(build_args)
+        except OSError as e:
+            logger.debug(f"Could not compute build context digest: {e}")
+            return None
+
+    def _hash_context(self, build_args: Optional[dict]) -> str:
+        """Hash the build inputs for _context_digest, raising OSError on unreadable files."""
+        rules = self._dockerignore_rules()
+        prune = not any(exception for _, exception in rules)
+
+        def is_ignored(path: str) -> bool:
+            ignored = False
+            for regex, exception in rules:
+                if regex.match(path):
+                    ignored = not exception
+            return ignored
+
+        digest = hashlib.sha256()
+
+        def add_file(name: str, path: Path, follow_symlinks: bool = False) -> None:
+            # Skip FIFOs, sockets and device nodes: opening them can block or fail
+            mode = os.stat(path, follow_symlinks=follow_symlinks).st_mode
+            if stat.S_ISLNK(mode):
+                digest.update(f"{name}\0".encode())
+                digest.update(os.readlink(path).encode())
+                return
+            if not stat.S_ISREG(mode):
+                return
+            digest.update(f"{name}\0".encode())
+            with path.open("rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                digest.update(f"{size}\0".encode())
+                if size > MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        digest.update(data)
+                else:
+                    digest.update(f.read())
+
+        def raise_error(error: OSError) -> None:
+            raise error
+
+        for root, dirs, files in os.walk(self.context_path, onerror=raise_error):
+            rel_root = Path(root).relative_to(self.context_path).as_posix()
+            prefix = "" if rel_root == "." else f"{rel_root}/"
+            dirs.sort()
+            # os.walk does not descend into directory symlinks, hash the link itself
+            for name in dirs:
+                if os.path.islink(os.path.join(root, name)) and not is_ignored(prefix + name):
+                    add_file(prefix + name, Path(root) / name)
+            if prune:
+                dirs[:] = [d for d in dirs if not is_ignored(prefix + d)]
+            for name in sorted(files):
+                if not is_ignored(prefix + name):
+                    add_file(prefix + name, Path(root) / name)
+
+        # The Dockerfile is always sent to the daemon, even when ignored or outside the
+        # context, and Docker reads the file a symlinked Dockerfile points to
+        add_file("--file", self.dockerfile_path, follow_symlinks=True)
+        for key, value in sorted((build_args or {}).items()):
+            digest.update(f"--build-arg\0{key}={value}\0".encode())
+        digest.update(f"--platform\0{','.join(self.platforms)}\0".encode())
+        return digest.hexdigest()
+
+    def _image_label(self, tag: str, label: str) -> Optional[str]:
+        """Get a label of a local image, if the image exists."""
+        result = subprocess.run(
+            ["docker", "image", "inspect", "--format", f'{{{{index .Config.Labels "{label}"}}}}', tag],
+            capture_output=True,
+            text=True,
+            executable=_which("docker"),
+            close_fds=False
+        )
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    def build_image(
+        self,
+        tags: List[str],
+        build_args: Optional[dict] = None,
+        push: bool = False,
+        export_cache: bool = True,
+        skip_unchanged: bool = False,
+        context_digest: Optional[str] = None
+    ) -> bool:
+        """Build the Docker image once for all tags and platforms.
+
+        The image is pushed straight from BuildKit when ``push`` is set,
+        otherwise it is loaded into the local image store. Multi-platform
+        images cannot be loaded, so without ``push`` they only populate
+        the build cache.
+
+        With ``skip_unchanged``, a single-platform build whose local image
+        was built from an identical context is skipped and only retagged.
+        ``context_digest`` is computed when not given.
+
+        Raises FileNotFoundError if the Dockerfile does not exist.
+        """
+        self.validate_dockerfile()
+
+        try:
+            if context_digest is None:
+                context_digest = self._context_digest(build_args)
+            if context_digest and tags and skip_unchanged and not push and not self.is_multi_platform:
+                if self._image_label(tags[0], CONTEXT_DIGEST_LABEL) == context_digest:
+                    logger.info(f"Build context unchanged since {tags[0]} was built, skipping build")
+                    for tag in tags[1:]:
+                        self.run_command(["docker", "tag", tags[0], tag])
+                    return True
+
             logger.info(f"Building Docker image from {self.dockerfile_path}")
-            
+
+            self.ensure_builder()
+
             # Construct build command
-            command = ["docker", "build"]
+            command = ["docker", "buildx", "build", "--builder", BUILDER_NAME]
+            command.extend(["--platform", ",".join(self.platforms)])
+            command.extend(["--progress", "plain"])
             
             # Add build arguments if provided
             if build_args:
-                for key, value in build_args.items():
-                    command.extend(["--build-arg", f"{key}={value}"])
+                command.extend(chain.from_iterable(
+                    ("--build-arg", f"{key}={value}") for key, value in build_args.items()
+                ))
             
+            if context_digest:
+                command.extend(["--label", f"{CONTEXT_DIGEST_LABEL}={context_digest}"])
+
+            # Add cache and output options
+            command.extend(self.cache_args(export=export_cache))
+
+            if push:
+                command.append("--push")
+            elif self.is_multi_platform:
+                logger.warning("Multi-platform images cannot be loaded locally, keeping the result in the build cache only")
+            else:
+                command.append("--load")
+
             # Add tags
-            for tag in tags:
-                command.extend(["-t", tag])
+            command.extend(chain.from_iterable(("-t", tag) for tag in tags))
             
             # Add dockerfile and context
-            command.extend(["-f", str(self.dockerfile_path), "."])
+            command.extend(["-f", str(self.dockerfile_path), str(self.context_path)])
             
             self.run_command(command)
             logger.info("Docker image built successfully")
@@ -185,14 +564,196 @@ class DockerBuilder:
             logger.error(f"Build failed: {e}")
             return False
     
+    def _registry_host(self) -> str:
+        """Get the host serving the Registry v2 API."""
+        if self.registry_url in DOCKER_HUB_HOSTS:
+            return "registry-1.docker.io"
+        return self.registry_url
+
+    def _split_tag(self, tag: str) -> Tuple[str, str]:
+        """Split a full image name into repository and tag."""
+        name, _, reference = tag.rpartition(":")
+        prefix = f"{self.registry_url}/"
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+        # Docker Hub serves single-component repositories under library/
+        if self.registry_url in DOCKER_HUB_HOSTS and "/" not in name:
+            name = f"library/{name}"
+        return name, reference
+
+    def _fetch_token(self, challenge: str) -> Optional[str]:
+        """Fetch a bearer token for a WWW-Authenticate challenge."""
+        params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+        realm = params.pop("realm", None)
+        if not realm:
+            return None
+
+        request = urllib.request.Request(f"{realm}?{urllib.parse.urlencode(params)}")
+        if self.username and self.password:
+            credentials = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+            request.add_header("Authorization", f"Basic {credentials}")
+
+        with urllib.request.urlopen(request, timeout=REGISTRY_TIMEOUT) as response:
+            body = json.load(response)
+        return body.get("token") or body.get("access_token")
+
+    def _registry_request(self, url: str, method: str = "GET", accept: Optional[str] = None):
+        """Send a Registry v2 API request, authenticating with a cached bearer token."""
+        headers = {}
+        if accept:
+            headers["Accept"] = accept
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+
+        try:
+            return _registry_opener.open(
+                urllib.request.Request(url, headers=headers, method=method),
+                timeout=REGISTRY_TIMEOUT
+            )
+        except urllib.error.HTTPError as e:
+            challenge = e.headers.get("WWW-Authenticate", "")
+            if e.code != 401 or not challenge.lower().startswith("bearer"):
+                raise
+            self._token = self._fetch_token(challenge)
+            if not self._token:
+                raise
+
+        headers["Authorization"] = f"Bearer {self._token}"
+        return _registry_opener.open(
+            urllib.request.Request(url, headers=headers, method=method),
+            timeout=REGISTRY_TIMEOUT
+        )
+
+    def _registry_url(self, repo: str, kind: str, reference: str) -> str:
+        """Get a Registry v2 API URL for a manifest or blob of a repository."""
+        return f"https://{self._registry_host()}/v2/{repo}/{kind}/{reference}"
+
+    def _remote_digest(self, tag: str) -> Optional[str]:
+        """Get the manifest digest of a tag in the registry, if it exists."""
+        repo, reference = self._split_tag(tag)
+        url = self._registry_url(repo, "manifests", reference)
+        try:
+            with self._registry_request(url, method="HEAD", accept=MANIFEST_MEDIA_TYPES) as response:
+                return response.headers.get("Docker-Content-Digest")
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not query remote digest of {tag}: {e}")
+            return None
+
+    def _remote_manifest(self, tag: str) -> Optional[dict]:
+        """Get the image manifest of a tag in the registry, if it exists.
+
+        For an image index, the manifest of its first platform image is
+        returned; all platforms are built from the same context.
+        """
+        repo, reference = self._split_tag(tag)
+        try:
+            with self._registry_request(
+                self._registry_url(repo, "manifests", reference), accept=MANIFEST_MEDIA_TYPES
+            ) as response:
+                manifest = json.load(response)
+
+            if "manifests" in manifest:
+                # Skip attestation manifests, which buildx tags with an unknown platform
+                images = [
+                    m for m in manifest["manifests"]
+                    if m.get("platform", {}).get("os", "unknown") != "unknown"
+                ]
+                if not images:
+                    return None
+                with self._registry_request(
+                    self._registry_url(repo, "manifests", images[0]["digest"]), accept=MANIFEST_MEDIA_TYPES
+                ) as response:
+                    manifest = json.load(response)
+            return manifest
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug(f"Could not fetch remote manifest of {tag}: {e}")
+            return None
+
+    def _remote_labels(self, tag: str) -> Optional[dict]:
+        """Get the image labels of a tag in the registry, if it exists."""
+        manifest = self._remote_manifest(tag)
+        if not manifest:
+            return None
+
+        repo, _ = self._split_tag(tag)
+        try:
+            config_digest = manifest["config"]["digest"]
+            with self._registry_request(self._registry_url(repo, "blobs", config_digest)) as response:
+                config = json.load(response)
+            return config.get("config", {}).get("Labels") or {}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug(f"Could not fetch remote labels of {tag}: {e}")
+            return None
+
+    def _local_digest(self, tag: str) -> Optional[str]:
+        """Get the registry digest recorded for a local image, if any."""
+        try:
+            output = subprocess.check_output(
+                ["docker", "image", "inspect", "--format", "{{json .RepoDigests}}", tag],
+                stderr=subprocess.DEVNULL,
+                text=True,
+                executable=_which("docker"),
+                close_fds=False
+            )
+            repo_digests = json.loads(output) or []
+        except (OSError, subprocess.CalledProcessError, ValueError) as e:
+            logger.debug(f"Could not inspect local digest of {tag}: {e}")
+            return None
+
+        name = tag.rpartition(":")[0]
+        for repo_digest in repo_digests:
+            repo, _, digest = repo_digest.partition("@")
+            if repo == name:
+                return digest
+        return None
+
+    def _push_tag(self, tag: str) -> Optional[subprocess.CompletedProcess]:
+        """Push a single tag unless the registry already has the local image.
+
+        Returns None when the push was skipped.
+        """
+        # A freshly built image has no registry digest yet, so only then query the registry
+        local_digest = self._local_digest(tag)
+        if local_digest and self._remote_digest(tag) == local_digest:
+            logger.info(f"Skipping push of {tag}: registry already has {local_digest}")
+            return None
+        return self.run_command(["docker", "push", tag], check=False, log_prefix=tag)
+
     def push_image(self, tags: List[str]) -> bool:
-        """Push the Docker image to the registry."""
+        """Push the Docker image to the registry, one worker per tag.
+
+        Tags whose remote manifest already matches the local image are skipped.
+        """
+        if not tags:
+            return True
+
         try:
-            for tag in tags:
-                logger.info(f"Pushing image: {tag}")
-                self.run_command(["docker", "push", tag])
-            
-            logger.info("All images pushed successfully")
+            failed = []
+            pushed = 0
+            with ThreadPoolExecutor(max_workers=min(MAX_PUSH_WORKERS, len(tags))) as executor:
+                futures = {executor.submit(self._push_tag, tag): tag for tag in tags}
+                for future in as_completed(futures):
+                    tag = futures[future]
+                    result = future.result()
+                    if result is None:
+                        continue
+                    if result.returncode == 0:
+                        logger.info(f"Pushed image: {tag}")
+                        pushed += 1
+                    else:
+                        logger.error(f"Push of {tag} failed with return code {result.returncode}")
+                        if result.stdout:
+                            logger.error(f"Error output for {tag}: {result.stdout}")
+                        failed.append(tag)
+
+            if failed:
+                logger.error(f"Failed to push: {', '.join(failed)}")
+                return False
+
+            if pushed:
+                logger.info("All images pushed successfully")
+            else:
+                logger.info("All images are up to date in the registry")
             return True
             
         except Exception as e:
@@ -201,18 +762,7 @@ class DockerBuilder:
     
     def get_full_image_name(self, tag: str) -> str:
         """Get the full image name including registry and namespace."""
-        if self.registry_url == "ghcr.io":
-            # For GitHub Container Registry, include the username
-            if self.username:
-                return f"{self.registry_url}/{self.username.lower()}/{self.image_name}:{tag}"
-            else:
-                return f"{self.registry_url}/{self.image_name}:{tag}"
-        else:
-            # For Docker Hub and other registries
-            if self.username:
-                return f"{self.registry_url}/{self.username}/{self.image_name}:{tag}"
-            else:
-                return f"{self.registry_url}/{self.image_name}:{tag}"
+        return f"{self._prefix}:{tag}"
 
 
 def main():
@@ -223,38 +773,38 @@ def main():
     
     parser.add_argument(
         "--registry-url",
-        default=os.getenv("REGISTRY_URL", "ghcr.io"),
+        default=_DEFAULTS["REGISTRY_URL"],
         help="Container registry URL (default: ghcr.io)"
     )
     
     parser.add_argument(
         "--username",
-        default=os.getenv("REGISTRY_USERNAME"),
+        default=_DEFAULTS["REGISTRY_USERNAME"],
         help="Registry username (can also use REGISTRY_USERNAME env var)"
     )
     
     parser.add_argument(
         "--password",
-        default=os.getenv("REGISTRY_PASSWORD"),
+        default=_DEFAULTS["REGISTRY_PASSWORD"],
         help="Registry password/token (can also use REGISTRY_PASSWORD env var)"
     )
     
     parser.add_argument(
         "--image-name",
-        default=os.getenv("IMAGE_NAME", "github-actions-runner-kubectl"),
+        default=_DEFAULTS["IMAGE_NAME"],
         help="Image name (default: github-actions-runner-kubectl)"
     )
     
     parser.add_argument(
         "--tags",
         nargs="+",
-        default=[os.getenv("IMAGE_TAG", "latest")],
+        default=[_DEFAULTS["IMAGE_TAG"]],
         help="Image tags (default: latest)"
     )
     
     parser.add_argument(
         "--dockerfile",
-        default=os.getenv("DOCKERFILE_PATH", "./Dockerfile"),
+        default=_DEFAULTS["DOCKERFILE_PATH"],
         help="Path to Dockerfile (default: ./Dockerfile)"
     )
     
@@ -269,6 +819,26 @@ def main():
         nargs="*",
         help="Build arguments in KEY=VALUE format"
     )
+
+    parser.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help="Skip building and pushing when the build context is unchanged since the last build"
+    )
+
+    parser.add_argument(
+        "--cache-backend",
+        choices=CACHE_BACKENDS,
+        default=_DEFAULTS["CACHE_BACKEND"],
+        help="BuildKit cache backend (default: registry, use gha on GitHub Actions)"
+    )
+
+    parser.add_argument(
+        "--platforms",
+        nargs="+",
+        default=DEFAULT_PLATFORMS,
+        help="Target platforms, e.g. linux/amd64 linux/arm64 (default: linux/amd64)"
+    )
     
     args = parser.parse_args()
     
@@ -289,25 +859,56 @@ def main():
             username=args.username,
             password=args.password,
             image_name=args.image_name,
-            dockerfile_path=args.dockerfile
+            dockerfile_path=args.dockerfile,
+            cache_backend=args.cache_backend,
+            platforms=[p for arg in args.platforms for p in arg.split(",") if p],
+            validate=True
         )
         
         # Generate full image names with tags
         full_tags = [builder.get_full_image_name(tag) for tag in args.tags]
-        
-        logger.info(f"Building image(s): {', '.join(full_tags)}")
-        
-        # Build the image
-        if not builder.build_image(full_tags, build_args):
-            sys.exit(1)
-        
-        # Push the image if not disabled
+
+        # The digest labels the image; with --skip-unchanged it is also compared
+        # against the registry and local images to skip unchanged builds
+        context_digest = builder._context_digest(build_args)
+
+        # Nothing to do if every tag in the registry was built from the current context
+        if args.skip_unchanged and not args.no_push and context_digest:
+            if all(
+                (builder._remote_labels(tag) or {}).get(CONTEXT_DIGEST_LABEL) == context_digest
+                for tag in full_tags
+            ):
+                logger.info("Cache hit: all tags are up to date in the registry, nothing to do")
+                return
+
+        # Login before building so the registry cache can be exported
+        login_success = False
         if not args.no_push:
-            login_success = builder.login()
+            login_success = builder._write_docker_auth()
             if not login_success:
                 logger.warning("Login failed, attempting to push without authentication")
                 logger.info("Note: If push fails, try logging in manually with: docker login " + args.registry_url)
 
+        logger.info(f"Building image(s): {', '.join(full_tags)}")
+        
+        # Build the image once for every tag; exporting a registry cache requires push access.
+        # Multi-platform manifest lists can only be pushed by buildx itself.
+        export_cache = not args.no_push or args.cache_backend != "registry"
+        push_from_build = builder.is_multi_platform and not args.no_push
+        if not builder.build_image(
+            full_tags,
+            build_args,
+            push=push_from_build,
+            export_cache=export_cache,
+            skip_unchanged=args.skip_unchanged,
+            context_digest=context_digest
+        ):
+            sys.exit(1)
+        
+        # Push the image if not disabled
+        if push_from_build:
+            logger.info("Images pushed by buildx")
+        elif not args.no_push:
             if not builder.push_image(full_tags):
                 if not login_success:
                     logger.error("Push failed. Try logging in manually first:")
@@ -0,0 +1,142 @@
+"""Tests for the build context digest and .dockerignore matching."""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from build_and_push import DockerBuilder
+
+
+class DockerignoreRegexTest(unittest.TestCase):
+    """Tests for DockerBuilder._dockerignore_regex."""
+
+    def matches(self, pattern: str, path: str) -> bool:
+        return bool(DockerBuilder._dockerignore_regex(pattern).match(path))
+
+    def test_star_does_not_cross_directories(self):
+        self.assertTrue(self.matches("*.md", "README.md"))
+        self.assertFalse(self.matches("*.md", "docs/README.md"))
+
+    def test_double_star_matches_any_depth(self):
+        self.assertTrue(self.matches("**/*.md", "README.md"))
+        self.assertTrue(self.matches("**/*.md", "docs/guide/README.md"))
+        self.assertTrue(self.matches("docs/**", "docs/guide/README.md"))
+        self.assertFalse(self.matches("**/*.md", "README.txt"))
+
+    def test_question_mark_matches_one_character(self):
+        self.assertTrue(self.matches("file?.txt", "file1.txt"))
+        self.assertFalse(self.matches("file?.txt", "file10.txt"))
+        self.assertFalse(self.matches("a?b", "a/b"))
+
+    def test_negated_character_class(self):
+        self.assertTrue(self.matches("[!a]b", "cb"))
+        self.assertFalse(self.matches("[!a]b", "ab"))
+        self.assertTrue(self.matches("[ab]c", "bc"))
+
+    def test_matches_descendants_of_matched_directory(self):
+        self.assertTrue(self.matches(".git", ".git"))
+        self.assertTrue(self.matches(".git", ".git/objects/pack"))
+        self.assertTrue(self.matches("build/*", "build/out/app"))
+        self.assertFalse(self.matches(".git", ".github/workflows"))
+
+
+class SplitTagTest(unittest.TestCase):
+    """Tests for DockerBuilder._split_tag."""
+
+    def test_strips_registry(self):
+        builder = DockerBuilder(username="Me")
+        self.assertEqual(
+            builder._split_tag(builder.get_full_image_name("v1")),
+            ("me/github-actions-runner-kubectl", "v1")
+        )
+
+    def test_docker_hub_without_namespace_uses_library(self):
+        builder = DockerBuilder(registry_url="docker.io", image_name="img")
+        self.assertEqual(builder._split_tag(builder.get_full_image_name("v1")), ("library/img", "v1"))
+
+    def test_docker_hub_with_namespace_is_unchanged(self):
+        builder = DockerBuilder(registry_url="docker.io", username="me", image_name="img")
+        self.assertEqual(builder._split_tag(builder.get_full_image_name("v1")), ("me/img", "v1"))
+
+
+class ContextDigestTest(unittest.TestCase):
+    """Tests for DockerBuilder._context_digest."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.context = Path(self.tmp.name)
+        (self.context / "Dockerfile").write_text("FROM scratch\n")
+        self.builder = DockerBuilder(
+            dockerfile_path=str(self.context / "Dockerfile"),
+            context_path=str(self.context)
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ignored_files_do_not_change_digest(self):
+        (self.context / ".dockerignore").write_text("*.md\n")
+        before = self.builder._context_digest()
+        (self.context / "NOTES.md").write_text("notes")
+        self.assertEqual(self.builder._context_digest(), before)
+
+        (self.context / "app.txt").write_text("app")
+        self.assertNotEqual(self.builder._context_digest(), before)
+
+    def test_exception_reincludes_file(self):
+        (self.context / ".dockerignore").write_text("docs\n!docs/KEEP.md\n")
+        (self.context / "docs").mkdir()
+        (self.context / "docs" / "other.md").write_text("a")
+        (self.context / "docs" / "KEEP.md").write_text("a")
+        before = self.builder._context_digest()
+
+        (self.context / "docs" / "other.md").write_text("b")
+        self.assertEqual(self.builder._context_digest(), before)
+
+        (self.context / "docs" / "KEEP.md").write_text("b")
+        self.assertNotEqual(self.builder._context_digest(), before)
+
+    def test_build_args_change_digest(self):
+        self.assertNotEqual(
+            self.builder._context_digest({"A": "1"}),
+            self.builder._context_digest({"A": "2"})
+        )
+
+    @unittest.skipUnless(hasattr(os, "mkfifo"), "requires mkfifo")
+    def test_fifo_is_skipped(self):
+        before = self.builder._context_digest()
+        os.mkfifo(self.context / "pipe")
+        self.assertEqual(self.builder._context_digest(), before)
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "requires symlinks")
+    def test_symlinked_dockerfile_target_changes_digest(self):
+        with tempfile.TemporaryDirectory() as outside:
+            target = Path(outside) / "Dockerfile.prod"
+            target.write_text("FROM scratch\n")
+            (self.context / "Dockerfile").unlink()
+            (self.context / "Dockerfile").symlink_to(target)
+            before = self.builder._context_digest()
+
+            target.write_text("FROM busybox\n")
+            self.assertNotEqual(self.builder._context_digest(), before)
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "requires symlinks")
+    def test_directory_symlink_target_changes_digest(self):
+        (self.context / "a").mkdir()
+        (self.context / "b").mkdir()
+        (self.context / "lib").symlink_to("a", target_is_directory=True)
+        before = self.builder._context_digest()
+
+        (self.context / "lib").unlink()
+        (self.context / "lib").symlink_to("b", target_is_directory=True)
+        self.assertNotEqual(self.builder._context_digest(), before)
+
+    def test_unreadable_context_returns_none(self):
+        with mock.patch("build_and_push.os.stat", side_effect=PermissionError("denied")):
+            self.assertIsNone(self.builder._context_digest())
+
+
+if __name__ == "__main__":
+    unittest.main()